@@ -22,7 +22,7 @@ within a graphical user interface.
 
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import Any, Optional
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
 
 
 class Handler(ABC):
@@ -38,41 +38,238 @@ class Handler(ABC):
 class AbstractHandler(Handler):
     _next_handler: Handler = None
 
+    # Requests equal to `key` are accepted. Handlers with other rules
+    # override `matches` instead.
+    key: Hashable = None
+
+    # Handlers that never accept the same request as another handler may be
+    # reordered by AdaptiveChain.
+    overlapping: bool = True
+
+    # Handlers whose handle() does nothing with a rejected request but pass it
+    # on may be skipped without calling handle() at all.
+    skippable: bool = False
+
+    def matches(self, request: Any) -> bool:
+        return request == self.key
+
+    def has_rule(self) -> bool:
+        return self.key is not None or type(self).matches is not AbstractHandler.matches
+
     def set_next(self, handler: Handler) -> Handler:
         self._next_handler = handler
         return handler
 
     @abstractmethod
     def handle(self, request: Any) -> str:
-        if self._next_handler:
-            return self._next_handler.handle(request)
+        # Skippable handlers with a known rule that reject the request are
+        # passed over in a loop. Any other handler is still called and passes
+        # the request on through super().handle(), one stack frame per hop, so
+        # a long run of such handlers can hit the recursion limit.
+        handler = self._next_handler
+        while (
+            isinstance(handler, AbstractHandler)
+            and handler.skippable
+            and handler.has_rule()
+            and not handler.matches(request)
+        ):
+            handler = handler._next_handler
+
+        if handler:
+            return handler.handle(request)
         return None
 
 
 class RequestAHandler(AbstractHandler):
+    key = "RequestA"
+    overlapping = False
+    skippable = True
+
     def handle(self, request: Any) -> str:
-        if request == "RequestA":
+        if self.matches(request):
             return f"RequestAHandler: I'll handle {request}"
         else:
             return super().handle(request)
 
 
 class RequestBHandler(AbstractHandler):
+    key = "RequestB"
+    overlapping = False
+    skippable = True
+
     def handle(self, request: Any) -> str:
-        if request == "RequestB":
+        if self.matches(request):
             return f"RequestBHandler: I'll handle {request}"
         else:
             return super().handle(request)
 
 
 class RequestCHandler(AbstractHandler):
+    key = "RequestC"
+    overlapping = False
+    skippable = True
+
     def handle(self, request: Any) -> str:
-        if request == "RequestC":
+        if self.matches(request):
             return f"RequestCHandler: I'll handle {request}"
         else:
             return super().handle(request)
 
 
+class CompiledChain(Handler):
+    def __init__(self, head: AbstractHandler) -> None:
+        self._head = head
+        self._compile()
+
+    def _compile(self) -> None:
+        self._handlers: List[AbstractHandler] = []
+        self._index: Dict[Hashable, int] = {}
+        self._predicates: List[Tuple[int, AbstractHandler]] = []
+        # First handler whose rule is unknown, the rest of the chain is
+        # walked as usual from there.
+        self._barrier: Optional[Handler] = None
+
+        handler = self._head
+        while handler is not None:
+            position = len(self._handlers)
+            if not isinstance(handler, AbstractHandler):
+                self._barrier = handler
+                break
+
+            self._handlers.append(handler)
+            if not handler.has_rule():
+                self._barrier = handler
+                break
+
+            if type(handler).matches is not AbstractHandler.matches:
+                self._predicates.append((position, handler))
+            else:
+                self._index.setdefault(handler.key, position)
+            handler = handler._next_handler
+
+    def set_next(self, handler: Handler) -> Handler:
+        tail = self._head
+        while tail._next_handler is not None:
+            tail = tail._next_handler
+        tail.set_next(handler)
+        self._compile()
+        return handler
+
+    def _route(self, request: Any) -> Optional[Handler]:
+        try:
+            position = self._index.get(request, len(self._handlers))
+        except TypeError:
+            position = len(self._handlers)
+
+        # Predicate handlers placed before the indexed match still go first.
+        for predicate_position, handler in self._predicates:
+            if predicate_position > position:
+                break
+            if handler.matches(request):
+                return handler
+
+        if position < len(self._handlers):
+            return self._handlers[position]
+        return self._barrier
+
+    def handle(self, request: Any) -> Optional[str]:
+        handler = self._route(request)
+        return handler.handle(request) if handler else None
+
+    def handle_many(self, requests: Iterable[Any]) -> List[Optional[str]]:
+        requests = list(requests)
+        routes: Dict[Hashable, Optional[Handler]] = {}
+        groups: Dict[Handler, List[int]] = {}
+
+        for position, request in enumerate(requests):
+            try:
+                handler = routes[request]
+            except KeyError:
+                handler = routes[request] = self._route(request)
+            except TypeError:
+                handler = self._route(request)
+
+            if handler is not None:
+                groups.setdefault(handler, []).append(position)
+
+        results: List[Optional[str]] = [None] * len(requests)
+        for handler, positions in groups.items():
+            for position in positions:
+                results[position] = handler.handle(requests[position])
+        return results
+
+
+class AdaptiveChain(Handler):
+    def __init__(self, head: AbstractHandler, reorder_every: int = 1000) -> None:
+        self._head = head
+        self._reorder_every = reorder_every
+        self._collect()
+
+    def _collect(self) -> None:
+        self._handlers: List[AbstractHandler] = []
+        self._barrier: Optional[Handler] = None
+
+        handler = self._head
+        while isinstance(handler, AbstractHandler) and handler.has_rule():
+            self._handlers.append(handler)
+            handler = handler._next_handler
+        self._barrier = handler
+
+        self._hits: Dict[Handler, int] = {handler: 0 for handler in self._handlers}
+        self._requests = 0
+        self._hops = 0
+
+    def set_next(self, handler: Handler) -> Handler:
+        tail = self._head
+        while tail._next_handler is not None:
+            tail = tail._next_handler
+        tail.set_next(handler)
+        self._collect()
+        return handler
+
+    def handle(self, request: Any) -> Optional[str]:
+        self._requests += 1
+        if not self._requests % self._reorder_every:
+            self.reorder()
+
+        for hops, handler in enumerate(self._handlers, 1):
+            if handler.matches(request):
+                self._hits[handler] += 1
+                self._hops += hops
+                return handler.handle(request)
+
+        self._hops += len(self._handlers)
+        return self._barrier.handle(request) if self._barrier else None
+
+    def reorder(self) -> None:
+        # Only runs of non-overlapping handlers are sorted, so an overlapping
+        # handler keeps its place relative to everything else.
+        ordered: List[AbstractHandler] = []
+        run: List[AbstractHandler] = []
+        for handler in self._handlers + [None]:
+            if handler is not None and not handler.overlapping:
+                run.append(handler)
+                continue
+
+            ordered.extend(sorted(run, key=self._hits.__getitem__, reverse=True))
+            run = []
+            if handler is not None:
+                ordered.append(handler)
+
+        self._handlers = ordered
+
+    @property
+    def statistics(self) -> Dict[str, Any]:
+        return {
+            "requests": self._requests,
+            "average_hops": self._hops / self._requests if self._requests else 0.0,
+            "hits": [
+                (type(handler).__name__, self._hits[handler])
+                for handler in self._handlers
+            ],
+        }
+
+
 def client_code(handler: Handler) -> None:
     for request in ["RequestA", "RequestB", "RequestC", "RequestD"]:
         print(f"\nClient: Who will handle {request}?")
@@ -96,3 +293,21 @@ if __name__ == "__main__":
 
     print("Subchain: RequestBHandler > RequestCHandler")
     client_code(request_b_handler)
+    print("\n")
+
+    print("Compiled chain: RequestAHandler > RequestBHandler > RequestCHandler")
+    client_code(CompiledChain(request_a_handler))
+    print("\n")
+
+    print("Client: Routing a batch of requests at once.")
+    requests = ["RequestC", "RequestA", "RequestD", "RequestC"]
+    results = CompiledChain(request_a_handler).handle_many(requests)
+    for request, result in zip(requests, results):
+        print(f"  {request}: {result}")
+    print("\n")
+
+    print("Client: Sending skewed traffic through an adaptive chain.")
+    adaptive = AdaptiveChain(request_a_handler, reorder_every=100)
+    for request in ["RequestC"] * 900 + ["RequestB"] * 90 + ["RequestA"] * 10:
+        adaptive.handle(request)
+    print(f"  {adaptive.statistics}")
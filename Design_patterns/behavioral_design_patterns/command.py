@@ -11,14 +11,54 @@ action or trigger an event.
 """
 
 from __future__ import annotations
+import asyncio
+import os
+import pickle
+import struct
+import threading
+import zlib
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Executor, Future
+from itertools import count
+from queue import PriorityQueue
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from weakref import WeakKeyDictionary
 
 
 class Command(ABC):
+    @property
+    def receiver(self) -> Optional[Receiver]:
+        return None
+
+    @property
+    def batch_key(self) -> Optional[Hashable]:
+        return None
+
     @abstractmethod
     def execute(self) -> None:
         pass
 
+    @classmethod
+    def execute_many(cls, commands: Sequence[Command]) -> None:
+        for command in commands:
+            command.execute()
+
+
+def _defining_class(cls: type, name: str) -> type:
+    return next(klass for klass in cls.__mro__ if name in vars(klass))
+
 
 class SimpleCommand(Command):
     def __init__(self, payload: str) -> None:
@@ -32,15 +72,37 @@ class SimpleCommand(Command):
 
 
 class ComplexCommand(Command):
+    # Subclasses that override execute() without a matching execute_many()
+    # set this once the inherited execute_many() is still correct for them.
+    batchable = False
+
     def __init__(self, receiver: Receiver, a: str, b: str) -> None:
         self._receiver = receiver
         self._a = a
         self._b = b
 
+    @property
+    def receiver(self) -> Receiver:
+        return self._receiver
+
+    @property
+    def batch_key(self) -> Optional[Hashable]:
+        cls = type(self)
+        batch_from = _defining_class(cls, "execute_many")
+        if batch_from is not _defining_class(cls, "execute") and not cls.batchable:
+            return None
+        return cls, self._receiver
+
     def execute(self) -> None:
         self._receiver.do_something(self._a)
         self._receiver.do_something_else(self._b)
 
+    @classmethod
+    def execute_many(cls, commands: Sequence[ComplexCommand]) -> None:
+        receiver = commands[0]._receiver
+        receiver.do_something_many([command._a for command in commands])
+        receiver.do_something_else_many([command._b for command in commands])
+
 
 class Receiver:
     def do_something(self, a: str) -> None:
@@ -49,10 +111,393 @@ class Receiver:
     def do_something_else(self, b: str) -> None:
         print(f"\nReceiver: Also working on ({b})", end="")
 
+    def do_something_many(self, items: List[str]) -> None:
+        print(f"\nReceiver: Working on ({', '.join(items)})", end="")
+
+    def do_something_else_many(self, items: List[str]) -> None:
+        print(f"\nReceiver: Also working on ({', '.join(items)})", end="")
+
+
+class BatchCommand(Command):
+    def __init__(self, commands: List[Command]) -> None:
+        self._commands = commands
+
+    @property
+    def receiver(self) -> Optional[Receiver]:
+        return self._commands[0].receiver
+
+    def execute(self) -> None:
+        type(self._commands[0]).execute_many(self._commands)
+
+
+def _execute(command: Command) -> Any:
+    return command.execute()
+
+
+class CommandQueue:
+    """
+    Runs submitted commands on worker threads, lowest priority value first.
+    Commands sharing a receiver never run at the same time. With `executor`
+    set (e.g. a ProcessPoolExecutor) workers hand the commands over to it.
+    """
+
+    _stop = object()
+
+    def __init__(
+        self, workers: int = 4, maxsize: int = 1024, executor: Executor = None
+    ) -> None:
+        self._queue: PriorityQueue = PriorityQueue(maxsize)
+        self._order = count()
+        self._executor = executor
+        # A receiver is busy while it has an entry here; commands that reach
+        # it meanwhile wait in the entry instead of blocking another worker.
+        self._deferred: WeakKeyDictionary[Receiver, Deque] = WeakKeyDictionary()
+        self._deferred_guard = threading.Lock()
+        self._workers = [
+            threading.Thread(target=self._work, daemon=True) for _ in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, command: Command, priority: int = 0) -> Future:
+        future: Future = Future()
+        # Blocks while the queue is full.
+        self._queue.put((priority, next(self._order), command, future))
+        return future
+
+    def submit_async(self, command: Command, priority: int = 0) -> asyncio.Future:
+        return asyncio.wrap_future(self.submit(command, priority))
+
+    def _run(self, command: Command) -> Any:
+        if self._executor is None:
+            return command.execute()
+        return self._executor.submit(_execute, command).result()
+
+    def _execute(self, command: Command, future: Future) -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(self._run(command))
+        except Exception as error:
+            future.set_exception(error)
+
+    def _work(self) -> None:
+        while True:
+            _, _, command, future = self._queue.get()
+            if command is self._stop:
+                return
+
+            receiver = command.receiver
+            if receiver is not None:
+                with self._deferred_guard:
+                    if receiver in self._deferred:
+                        self._deferred[receiver].append((command, future))
+                        continue
+                    self._deferred[receiver] = deque()
+
+            self._execute(command, future)
+            # Drain whatever was deferred for the receiver while it was busy.
+            while receiver is not None:
+                with self._deferred_guard:
+                    pending = self._deferred[receiver]
+                    if not pending:
+                        del self._deferred[receiver]
+                        break
+                    command, future = pending.popleft()
+                self._execute(command, future)
+
+    def close(self) -> None:
+        for _ in self._workers:
+            self._queue.put((float("inf"), next(self._order), self._stop, None))
+        for worker in self._workers:
+            worker.join()
+
+
+class CommandBatcher:
+    """
+    Holds commands that share a batch key until `max_size` of them are
+    pending or `max_delay` seconds passed since the first one, then runs
+    them as one BatchCommand, on `queue` when given.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 100,
+        max_delay: float = 0.05,
+        queue: Optional[CommandQueue] = None,
+    ) -> None:
+        self._max_size = max_size
+        self._max_delay = max_delay
+        self._queue = queue
+        self._pending: Dict[Hashable, List[Command]] = {}
+        self._futures: Dict[Hashable, List[Future]] = {}
+        self._timers: Dict[Hashable, threading.Timer] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, command: Command) -> Future:
+        key = command.batch_key
+        if key is None:
+            return self._dispatch([command], [Future()])
+
+        future: Future = Future()
+        with self._lock:
+            commands = self._pending.setdefault(key, [])
+            commands.append(command)
+            self._futures.setdefault(key, []).append(future)
+
+            if len(commands) < self._max_size:
+                if len(commands) == 1:
+                    timer = threading.Timer(self._max_delay, self._flush, (key,))
+                    timer.daemon = True
+                    self._timers[key] = timer
+                    timer.start()
+                return future
+
+        self._flush(key)
+        return future
+
+    def _flush(self, key: Hashable) -> None:
+        with self._lock:
+            commands = self._pending.pop(key, None)
+            futures = self._futures.pop(key, None)
+            timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        if commands:
+            self._dispatch(commands, futures)
+
+    def flush(self) -> None:
+        for key in list(self._pending):
+            self._flush(key)
+
+    def _dispatch(self, commands: List[Command], futures: List[Future]) -> Future:
+        batch = BatchCommand(commands)
+        if self._queue is None:
+            done: Future = Future()
+            try:
+                done.set_result(batch.execute())
+            except Exception as error:
+                done.set_exception(error)
+        else:
+            done = self._queue.submit(batch)
+
+        def resolve(done: Future) -> None:
+            for future in futures:
+                if done.exception() is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(done.exception())
+
+        done.add_done_callback(resolve)
+        return futures[0]
+
+
+class CommandJournal:
+    """
+    Write-ahead log of pickled commands split into segment files, each named
+    after the first sequence it holds. A waiting append wakes a background
+    thread whose single fsync covers everything written until then; other
+    records are synced within `group_delay` seconds or once `group_size`
+    of them are pending.
+    """
+
+    _frame = struct.Struct("<II")  # payload length, crc32
+
+    def __init__(
+        self,
+        directory: str,
+        segment_size: int = 1 << 20,
+        group_size: int = 64,
+        group_delay: float = 0.005,
+    ) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._segment_size = segment_size
+        self._group_size = group_size
+        self._group_delay = group_delay
+        self._keys: Dict[Hashable, int] = {}
+        self._sequence = 0
+
+        segments = self._segments()
+        if segments:
+            # The name of the last segment keeps the sequence even after
+            # compaction removed every record before it.
+            self._sequence = self._first(segments[-1]) - 1
+        for sequence, key, _ in self._records(repair=True):
+            self._sequence = max(self._sequence, sequence)
+            if key is not None:
+                self._keys[key] = sequence
+
+        self._segment = segments[-1] if segments else self._path(1)
+        self._file = open(self._segment, "ab")
+        self._durable = self._sequence
+        self._pending = 0
+
+        self._lock = threading.Lock()
+        self._synced = threading.Condition(self._lock)
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    def _path(self, number: int) -> str:
+        return os.path.join(self._directory, f"{number:08d}.log")
+
+    @staticmethod
+    def _first(path: str) -> int:
+        return int(os.path.basename(path)[:-4])
+
+    def _segments(self) -> List[str]:
+        paths = [
+            os.path.join(self._directory, name)
+            for name in os.listdir(self._directory)
+            if name.endswith(".log")
+        ]
+        return sorted(paths, key=self._first)
+
+    def _read_segment(self, path: str) -> Tuple[List[Tuple[int, Hashable, Any]], int]:
+        records = []
+        with open(path, "rb") as segment:
+            data = segment.read()
+
+        offset = 0
+        while offset + self._frame.size <= len(data):
+            length, checksum = self._frame.unpack_from(data, offset)
+            start = offset + self._frame.size
+            payload = data[start : start + length]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                break
+            records.append(pickle.loads(payload))
+            offset = start + length
+        return records, offset
+
+    def _records(self, repair: bool = False) -> Iterator[Tuple[int, Hashable, Any]]:
+        segments = self._segments()
+        for path in segments:
+            records, valid = self._read_segment(path)
+            # A torn write can only be at the end of the last segment.
+            if repair and path == segments[-1]:
+                os.truncate(path, valid)
+            yield from records
+
+    def _rotate(self) -> None:
+        self._sync()
+        self._file.close()
+        self._segment = self._path(self._sequence + 1)
+        self._file = open(self._segment, "ab")
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._durable = self._sequence
+        self._pending = 0
+        self._synced.notify_all()
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._wake.wait(self._group_delay)
+            self._wake.clear()
+            with self._lock:
+                if self._durable >= self._sequence or self._file.closed:
+                    continue
+                self._file.flush()
+                synced = self._sequence
+                self._pending = 0
+                # Appends go on while the fsync runs; the duplicate stays
+                # valid even if a rotation closes the file meanwhile.
+                descriptor = os.dup(self._file.fileno())
+
+            try:
+                os.fsync(descriptor)
+            finally:
+                os.close(descriptor)
+
+            with self._lock:
+                self._durable = max(self._durable, synced)
+                self._synced.notify_all()
+
+    def append(self, command: Command, key: Hashable = None, wait: bool = True) -> int:
+        with self._lock:
+            if key is not None and key in self._keys:
+                return self._keys[key]
+
+            self._sequence += 1
+            sequence = self._sequence
+            payload = pickle.dumps((sequence, key, command))
+            self._file.write(self._frame.pack(len(payload), zlib.crc32(payload)))
+            self._file.write(payload)
+            if key is not None:
+                self._keys[key] = sequence
+
+            if self._file.tell() >= self._segment_size:
+                self._rotate()
+
+            self._pending += 1
+            if wait or self._pending >= self._group_size:
+                self._wake.set()
+
+            while wait and self._durable < sequence:
+                self._synced.wait()
+
+        return sequence
+
+    def replay(self, apply: Callable[[Command], Any] = _execute, after: int = 0) -> int:
+        with self._lock:
+            self._file.flush()
+
+        replayed = 0
+        for sequence, _, command in self._records():
+            if sequence <= after:
+                continue
+            apply(command)
+            replayed += 1
+        return replayed
+
+    def compact(self, upto: int) -> None:
+        # Commands up to `upto` are dropped together with their keys, so only
+        # compact commands that will not be retried. The current segment is
+        # left alone.
+        with self._lock:
+            for path in self._segments():
+                if path == self._segment:
+                    break
+
+                records, _ = self._read_segment(path)
+                kept = [record for record in records if record[0] > upto]
+                if not kept:
+                    os.remove(path)
+                    continue
+                if len(kept) == len(records):
+                    continue
+
+                with open(f"{path}.tmp", "wb") as segment:
+                    for record in kept:
+                        payload = pickle.dumps(record)
+                        segment.write(
+                            self._frame.pack(len(payload), zlib.crc32(payload))
+                        )
+                        segment.write(payload)
+                    segment.flush()
+                    os.fsync(segment.fileno())
+                os.replace(f"{path}.tmp", path)
+
+            self._keys = {
+                key: sequence for key, sequence in self._keys.items() if sequence > upto
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._sync()
+            self._closed = True
+            self._file.close()
+        self._wake.set()
+        self._flusher.join()
+
 
 class Invoker:
     _on_start = None
     _on_finish = None
+    _queue: CommandQueue = None
 
     def set_on_start(self, command: Command):
         self._on_start = command
@@ -60,22 +505,73 @@ class Invoker:
     def set_on_finish(self, command: Command):
         self._on_finish = command
 
-    def do_something_important(self) -> None:
+    def set_queue(self, queue: CommandQueue):
+        self._queue = queue
+
+    def _run(self, command: Command, futures: List[Future]) -> None:
+        if self._queue is None:
+            command.execute()
+        else:
+            futures.append(self._queue.submit(command))
+
+    def do_something_important(self) -> List[Future]:
+        futures: List[Future] = []
         print("Invoker: Beginning process...")
         if isinstance(self._on_start, Command):
-            self._on_start.execute()
+            self._run(self._on_start, futures)
 
         print("Invoker: ...doing something important...")
 
         print("Invoker: ...finishing process...")
         if isinstance(self._on_finish, Command):
-            self._on_finish.execute()
+            self._run(self._on_finish, futures)
+
+        return futures
 
 
 if __name__ == "__main__":
+    import tempfile
+
     invoker = Invoker()
     invoker.set_on_start(SimpleCommand("Say Hi!"))
     receiver = Receiver()
     invoker.set_on_finish(ComplexCommand(receiver, "Send email", "Save report"))
 
     invoker.do_something_important()
+
+    print("\n\nClient: Handing the commands over to a queue.")
+    queue = CommandQueue(workers=4)
+    invoker.set_queue(queue)
+    futures = invoker.do_something_important()
+    futures += [
+        queue.submit(ComplexCommand(receiver, f"Email {number}", f"Report {number}"))
+        for number in range(3)
+    ]
+    for future in futures:
+        future.result()
+
+    print("\n\nClient: Batching commands for the same receiver.")
+    batcher = CommandBatcher(max_size=3, max_delay=0.1, queue=queue)
+    futures = [
+        batcher.submit(ComplexCommand(receiver, f"Email {number}", f"Report {number}"))
+        for number in range(5)
+    ]
+    for future in futures:
+        future.result()
+    queue.close()
+
+    print("\n\nClient: Journaling commands before running them.")
+    directory = tempfile.mkdtemp()
+    journal = CommandJournal(directory, segment_size=256)
+    for number in range(4):
+        command = ComplexCommand(receiver, f"Email {number}", f"Report {number}")
+        journal.append(command, key=f"order-{number}")
+    journal.append(ComplexCommand(receiver, "Email 0", "Report 0"), key="order-0")
+    journal.close()
+
+    print("Client: Replaying the journal after a restart.", end="")
+    journal = CommandJournal(directory)
+    journal.compact(upto=2)
+    journal.replay()
+    journal.close()
+    print()
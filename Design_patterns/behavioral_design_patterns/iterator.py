@@ -11,8 +11,15 @@ its underlying implementation”.
 """
 
 from __future__ import annotations
-from collections.abc import Iterable, Iterator
-from typing import Any, List
+import mmap
+import os
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Chunks = Iterator[List[Any]]
 
 
 class InOrderIterator(Iterator):
@@ -35,9 +42,68 @@ class InOrderIterator(Iterator):
         return value
 
 
-class WordsCollection(Iterable):
-    def __init__(self, collection: List[Any] = []) -> None:
+class RangeIterator(Iterator):
+    def __init__(self, collection: Sequence, positions: range) -> None:
         self._collection = collection
+        self._positions = positions
+        self._position = 0
+
+    def __next__(self):
+        if self._position >= len(self._positions):
+            raise StopIteration()
+
+        value = self._collection[self._positions[self._position]]
+        self._position += 1
+        return value
+
+    def __len__(self) -> int:
+        return len(self._positions) - self._position
+
+    def __reduce__(self) -> Tuple[type, Tuple[List[Any], range]]:
+        # Sent to another process, a partition carries only its own items
+        # instead of the whole collection.
+        remaining = self._positions[self._position :]
+        items = [self._collection[position] for position in remaining]
+        return RangeIterator, (items, range(len(items)))
+
+    def try_split(self) -> Optional[RangeIterator]:
+        # Hands the first half of what is left to a new iterator, so both
+        # halves can be consumed independently.
+        remaining = self._positions[self._position :]
+        if len(remaining) < 2:
+            return None
+
+        middle = len(remaining) // 2
+        self._positions = remaining[middle:]
+        self._position = 0
+        return RangeIterator(self._collection, remaining[:middle])
+
+
+class SplittableMixin:
+    def _sequence(self) -> Sequence:
+        return self
+
+    def get_range_iterator(self, start: int, stop: int) -> RangeIterator:
+        sequence = self._sequence()
+        return RangeIterator(sequence, range(len(sequence))[start:stop])
+
+    def get_stride_iterator(self, offset: int, stride: int) -> RangeIterator:
+        sequence = self._sequence()
+        return RangeIterator(sequence, range(offset, len(sequence), stride))
+
+    def partition(self, parts: int) -> List[RangeIterator]:
+        sequence = self._sequence()
+        size = len(sequence)
+        bounds = [size * part // parts for part in range(parts + 1)]
+        return [
+            RangeIterator(sequence, range(start, stop))
+            for start, stop in zip(bounds, bounds[1:])
+        ]
+
+
+class WordsCollection(SplittableMixin, Iterable):
+    def __init__(self, collection: Optional[List[Any]] = None) -> None:
+        self._collection = collection if collection is not None else []
 
     def __iter__(self) -> InOrderIterator:
         return InOrderIterator(self._collection)
@@ -48,8 +114,202 @@ class WordsCollection(Iterable):
     def add_item(self, item: Any):
         self._collection.append(item)
 
+    def _sequence(self) -> Sequence:
+        return self._collection
+
+
+class CompactWordsCollection(SplittableMixin, Iterable):
+    """
+    Words live in one UTF-8 buffer indexed by an offsets array and are only
+    decoded when read. With `intern=True` every distinct word is stored once
+    and items become integer codes into that dictionary. freeze() drops the
+    word lookup table once the collection is built.
+    """
+
+    def __init__(self, words: Iterable[str] = (), intern: bool = False) -> None:
+        self._buffer = bytearray()
+        self._offsets = array("Q", [0])
+        self._codes: Optional[array] = array("I") if intern else None
+        self._dictionary: Optional[Dict[str, int]] = {}
+        for word in words:
+            self.add_item(word)
+
+    def _append(self, word: str) -> int:
+        self._buffer += word.encode("utf-8")
+        self._offsets.append(len(self._buffer))
+        return len(self._offsets) - 2
+
+    def add_item(self, item: str) -> None:
+        if self._codes is None:
+            self._append(item)
+            return
+        if self._dictionary is None:
+            raise RuntimeError("Can't add words to a frozen interned collection")
+
+        code = self._dictionary.get(item)
+        if code is None:
+            code = self._dictionary[item] = self._append(item)
+        self._codes.append(code)
+
+    def freeze(self) -> CompactWordsCollection:
+        # The lookup table keeps a str per distinct word, only needed to add.
+        self._dictionary = None
+        return self
+
+    def __len__(self) -> int:
+        if self._codes is None:
+            return len(self._offsets) - 1
+        return len(self._codes)
+
+    def __getitem__(self, index: int) -> str:
+        code = index if self._codes is None else self._codes[index]
+        if code < 0:
+            code += len(self)
+        if not 0 <= code < len(self._offsets) - 1:
+            raise IndexError("collection index out of range")
+
+        start, stop = self._offsets[code], self._offsets[code + 1]
+        return self._buffer[start:stop].decode("utf-8")
+
+    def __iter__(self) -> InOrderIterator:
+        return InOrderIterator(self)
+
+    def get_reverse_iterator(self) -> InOrderIterator:
+        return InOrderIterator(self, reverse=True)
+
+
+def _chunked(items: Iterable, size: int) -> Chunks:
+    items = iter(items)
+    while chunk := list(islice(items, size)):
+        yield chunk
+
+
+def _rechunk(chunks: Chunks, size: int) -> Chunks:
+    pending: List[Any] = []
+    for chunk in chunks:
+        pending.extend(chunk)
+        start = 0
+        while len(pending) - start >= size:
+            yield pending[start : start + size]
+            start += size
+        pending = pending[start:]
+
+    if pending:
+        yield pending
+
+
+def _read_words(read: Callable[[int], bytes], skip: int, block_size: int) -> Chunks:
+    # One word per line. Whole blocks are skipped by counting newlines,
+    # without decoding them.
+    tail = b""
+    while block := read(block_size):
+        head, newline, tail = (tail + block).rpartition(b"\n")
+        if not newline:
+            continue
+
+        count = head.count(b"\n") + 1
+        if skip >= count:
+            skip -= count
+            continue
+
+        words = head.decode("utf-8").split("\n")
+        yield words[skip:] if skip else words
+        skip = 0
+
+    if tail and not skip:
+        yield [tail.decode("utf-8")]
+
+
+class StreamingWordsCollection(Iterable):
+    def __init__(
+        self,
+        open_source: Callable[[int], Chunks],
+        chunk_size: int = 1024,
+        skip: int = 0,
+        stages: Tuple[Callable[[Chunks], Chunks], ...] = (),
+    ) -> None:
+        self._open_source = open_source
+        self._chunk_size = chunk_size
+        self._skip = skip
+        self._stages = stages
+
+    @classmethod
+    def from_iterable(
+        cls, factory: Callable[[], Iterable], chunk_size: int = 1024
+    ) -> StreamingWordsCollection:
+        def open_source(skip: int) -> Chunks:
+            return _chunked(islice(factory(), skip, None), chunk_size)
+
+        return cls(open_source, chunk_size)
+
+    @classmethod
+    def from_file(
+        cls, path: str, chunk_size: int = 1024, block_size: int = 1 << 16
+    ) -> StreamingWordsCollection:
+        def open_source(skip: int) -> Chunks:
+            with open(path, "rb") as file:
+                yield from _read_words(file.read, skip, block_size)
+
+        return cls(open_source, chunk_size)
+
+    @classmethod
+    def from_mmap(
+        cls, path: str, chunk_size: int = 1024, block_size: int = 1 << 16
+    ) -> StreamingWordsCollection:
+        def open_source(skip: int) -> Chunks:
+            with open(path, "rb") as file:
+                # An empty file can't be mapped, and has no words anyway.
+                if not os.fstat(file.fileno()).st_size:
+                    return
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    yield from _read_words(buffer.read, skip, block_size)
+
+        return cls(open_source, chunk_size)
+
+    def _with(self, **changes: Any) -> StreamingWordsCollection:
+        options = {
+            "chunk_size": self._chunk_size,
+            "skip": self._skip,
+            "stages": self._stages,
+            **changes,
+        }
+        return StreamingWordsCollection(self._open_source, **options)
+
+    def _stage(self, stage: Callable[[Chunks], Chunks]) -> StreamingWordsCollection:
+        return self._with(stages=self._stages + (stage,))
+
+    def skip(self, count: int) -> StreamingWordsCollection:
+        if not self._stages:
+            return self._with(skip=self._skip + count)
+
+        return self._stage(
+            lambda chunks: _chunked(
+                islice(chain.from_iterable(chunks), count, None), self._chunk_size
+            )
+        )
+
+    def map(self, function: Callable[[Any], Any]) -> StreamingWordsCollection:
+        return self._stage(lambda chunks: (list(map(function, c)) for c in chunks))
+
+    def filter(self, predicate: Callable[[Any], bool]) -> StreamingWordsCollection:
+        return self._stage(lambda chunks: (list(filter(predicate, c)) for c in chunks))
+
+    def batch(self, size: int) -> StreamingWordsCollection:
+        return self._stage(lambda chunks: ([batch] for batch in _rechunk(chunks, size)))
+
+    def chunks(self) -> Chunks:
+        chunks = _rechunk(self._open_source(self._skip), self._chunk_size)
+        for stage in self._stages:
+            chunks = stage(chunks)
+        return chunks
+
+    def __iter__(self) -> Iterator:
+        return chain.from_iterable(self.chunks())
+
 
 if __name__ == "__main__":
+    import tempfile
+
     collection = WordsCollection()
     collection.add_item("First")
     collection.add_item("Second")
@@ -61,3 +321,45 @@ if __name__ == "__main__":
 
     print("Reverse traversal:")
     print("\n".join(collection.get_reverse_iterator()), end="")
+    print("\n")
+
+    path = os.path.join(tempfile.mkdtemp(), "words.txt")
+    with open(path, "w") as file:
+        file.write("\n".join(f"word{number}" for number in range(100_000)))
+
+    print("Compact traversal:")
+    compact = CompactWordsCollection(
+        ["First", "Second", "First", "Third"], intern=True
+    ).freeze()
+    print("\n".join(compact))
+    print("")
+
+    print("Compact reverse traversal:")
+    print("\n".join(compact.get_reverse_iterator()))
+    print("")
+
+    print("Partitioned traversal:")
+    collection = WordsCollection([f"word{number}" for number in range(10)])
+    with ProcessPoolExecutor(max_workers=3) as executor:
+        for part in executor.map(list, collection.partition(3)):
+            print(part)
+    print("")
+
+    print("Stride traversal:")
+    print(list(collection.get_stride_iterator(1, 3)))
+    print("")
+
+    print("Split traversal:")
+    iterator = collection.get_range_iterator(2, 8)
+    print(list(iterator.try_split()), list(iterator))
+    print("")
+
+    print("Streaming traversal:")
+    stream = StreamingWordsCollection.from_mmap(path, chunk_size=4096)
+    stream = stream.skip(99_990).map(str.upper).filter(lambda word: word[-1] in "02468")
+    print("\n".join(stream))
+    print("")
+
+    print("Batched traversal:")
+    for batch in StreamingWordsCollection.from_file(path).skip(99_994).batch(3):
+        print(batch)
@@ -9,7 +9,25 @@ communication.
 """
 
 from __future__ import annotations
+import asyncio
 from abc import ABC
+from itertools import count
+from time import perf_counter
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+Route = Callable[[object, str], None]
+Reaction = Callable[[object, str], Awaitable[Any]]
+Pair = Tuple[object, str]
 
 
 class Mediator(ABC):
@@ -34,6 +52,188 @@ class ConcreteMediator(Mediator):
             self._component2.do_c()
 
 
+class RoutingMediator(Mediator):
+    """
+    Routes events through a table keyed by event name. A route registered
+    for "*" sees every event and one for "order.*" sees "order.paid" etc.
+    """
+
+    def __init__(self) -> None:
+        self._components: Dict[str, BaseComponent] = {}
+        self._routes: Dict[str, Dict[int, Route]] = {}
+        self._patterns: Dict[int, str] = {}
+        self._ids = count()
+
+    def register(self, name: str, component: BaseComponent) -> BaseComponent:
+        self._components[name] = component
+        component.mediator = self
+        return component
+
+    def unregister(self, name: str) -> None:
+        self._components.pop(name).mediator = None
+
+    def __getitem__(self, name: str) -> BaseComponent:
+        return self._components[name]
+
+    def add_route(self, pattern: str, route: Route) -> int:
+        route_id = next(self._ids)
+        self._routes.setdefault(pattern, {})[route_id] = route
+        self._patterns[route_id] = pattern
+        return route_id
+
+    def remove_route(self, route_id: int) -> None:
+        pattern = self._patterns.pop(route_id)
+        routes = self._routes[pattern]
+        del routes[route_id]
+        if not routes:
+            del self._routes[pattern]
+
+    def _patterns_for(self, event: str) -> List[str]:
+        patterns = [event, "*"]
+        prefix, _, _ = event.rpartition(".")
+        while prefix:
+            patterns.append(f"{prefix}.*")
+            prefix, _, _ = prefix.rpartition(".")
+        return patterns
+
+    def notify(self, sender: object, event: str) -> None:
+        matched: List[Tuple[int, Route]] = []
+        for pattern in self._patterns_for(event):
+            matched.extend(self._routes.get(pattern, {}).items())
+
+        # Routes run in the order they were added, whatever matched them.
+        for _, route in sorted(matched, key=lambda item: item[0]):
+            route(sender, event)
+
+
+class QueuedMediator(RoutingMediator):
+    """
+    Events raised while other events are being handled are queued for the
+    next tick instead of running on the call stack. Identical (sender, event)
+    pairs pending in the same tick are merged, and a pair raised by its own
+    consequences is skipped (and reported) to break the cycle.
+    """
+
+    def __init__(self, max_ticks: int = 1000) -> None:
+        super().__init__()
+        self._max_ticks = max_ticks
+        # Each pending pair maps to the pairs that caused it.
+        self._pending: Dict[Pair, FrozenSet[Pair]] = {}
+        self._cause: FrozenSet[Pair] = frozenset()
+        self._running = False
+
+    def notify(self, sender: object, event: str) -> None:
+        self._pending.setdefault((sender, event), self._cause)
+        if not self._running:
+            self._run()
+
+    def _run(self) -> None:
+        self._running = True
+        try:
+            for _ in range(self._max_ticks):
+                if not self._pending:
+                    return
+
+                tick, self._pending = self._pending, {}
+                for pair, cause in tick.items():
+                    if pair in cause:
+                        print(f"Mediator skips {pair[1]}, it caused itself.")
+                        continue
+                    self._cause = cause | {pair}
+                    super().notify(*pair)
+
+            raise RuntimeError(
+                f"Event cascade did not settle in {self._max_ticks} ticks"
+            )
+        finally:
+            self._pending = {}
+            self._cause = frozenset()
+            self._running = False
+
+
+class AsyncMediator(Mediator):
+    """
+    Reactions to one event run concurrently unless one is declared to run
+    `after` others. Awaiting notify() gives each reaction's result by name.
+    """
+
+    def __init__(self) -> None:
+        self._reactions: Dict[str, Dict[str, Tuple[Reaction, Sequence[str]]]] = {}
+        # Events whose `after` names all exist, until their reactions change.
+        self._checked: Set[str] = set()
+
+    def _waits_on(self, event: str, name: str, after: Sequence[str]) -> bool:
+        reactions = self._reactions.get(event, {})
+        stack, seen = list(after), set()
+        while stack:
+            other = stack.pop()
+            if other == name:
+                return True
+            if other in seen or other not in reactions:
+                continue
+            seen.add(other)
+            stack.extend(reactions[other][1])
+        return False
+
+    def add_reaction(
+        self, event: str, name: str, reaction: Reaction, after: Sequence[str] = ()
+    ) -> None:
+        # The reactions stay acyclic, so only a path from `after` back to
+        # `name` can close a cycle. Unknown names may still be added later.
+        if self._waits_on(event, name, after):
+            raise ValueError(f"Reaction {name!r} to {event} would wait on itself")
+        self._reactions.setdefault(event, {})[name] = (reaction, tuple(after))
+        self._checked.discard(event)
+
+    def remove_reaction(self, event: str, name: str) -> None:
+        del self._reactions[event][name]
+        self._checked.discard(event)
+
+    def _check(self, event: str) -> None:
+        if event in self._checked:
+            return
+
+        reactions = self._reactions.get(event, {})
+        for name, (_, after) in reactions.items():
+            unknown = [other for other in after if other not in reactions]
+            if unknown:
+                raise ValueError(
+                    f"Reaction {name!r} to {event} runs after unknown {unknown}"
+                )
+        self._checked.add(event)
+
+    async def _react(
+        self,
+        reaction: Reaction,
+        after: Sequence[str],
+        tasks: Dict[str, asyncio.Task],
+        sender: object,
+        event: str,
+    ) -> Any:
+        if after:
+            await asyncio.gather(*(tasks[name] for name in after))
+        return await reaction(sender, event)
+
+    async def notify(self, sender: object, event: str) -> Dict[str, Any]:
+        self._check(event)
+        reactions = self._reactions.get(event, {})
+        # All tasks exist before any of them starts, so `after` can refer to
+        # reactions added later.
+        tasks: Dict[str, asyncio.Task] = {}
+        for name, (reaction, after) in reactions.items():
+            tasks[name] = asyncio.create_task(
+                self._react(reaction, after, tasks, sender, event)
+            )
+
+        try:
+            results = await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        return dict(zip(tasks, results))
+
+
 class BaseComponent:
     def __init__(self, mediator: Mediator = None) -> None:
         self._mediator = mediator
@@ -67,6 +267,36 @@ class Component2(BaseComponent):
         self.mediator.notify(self, "D")
 
 
+class AsyncComponent(BaseComponent):
+    def __init__(self, name: str, mediator: Mediator = None) -> None:
+        super().__init__(mediator)
+        self._name = name
+
+    async def do(self, operation: str, delay: float = 0.1) -> str:
+        await asyncio.sleep(delay)
+        print(f"{self._name} does {operation}.")
+        return operation
+
+    async def trigger(self, event: str) -> Dict[str, Any]:
+        print(f"{self._name} triggers {event}.")
+        return await self.mediator.notify(self, event)
+
+
+async def async_client_code() -> None:
+    mediator = AsyncMediator()
+    c1 = AsyncComponent("Component 1", mediator)
+    c2 = AsyncComponent("Component 2", mediator)
+    mediator.add_reaction("D", "b", lambda sender, event: c1.do("B"))
+    mediator.add_reaction("D", "c", lambda sender, event: c2.do("C"))
+    mediator.add_reaction(
+        "D", "report", lambda sender, event: c1.do("a report", 0), after=("b", "c")
+    )
+
+    started = perf_counter()
+    results = await c2.trigger("D")
+    print(f"Mediator got {results} in {perf_counter() - started:.2f}s.")
+
+
 if __name__ == "__main__":
     c1 = Component1()
     c2 = Component2()
@@ -79,3 +309,42 @@ if __name__ == "__main__":
 
     print("Client triggers operation D.")
     c2.do_d()
+
+    print("\n", end="")
+
+    mediator = RoutingMediator()
+    c1 = mediator.register("component1", Component1())
+    c2 = mediator.register("component2", Component2())
+    logger = mediator.add_route(
+        "*", lambda sender, event: print(f"Mediator routes {event}.")
+    )
+
+    mediator.add_route("A", lambda sender, event: mediator["component2"].do_c())
+    mediator.add_route("D", lambda sender, event: mediator["component1"].do_b())
+    mediator.add_route("D", lambda sender, event: mediator["component2"].do_c())
+    print("Client triggers operation D through the routing table.")
+    c2.do_d()
+
+    print("\n", end="")
+
+    print("Client removes the logging route and triggers operation A.")
+    mediator.remove_route(logger)
+    c1.do_a()
+
+    print("\n", end="")
+
+    mediator = QueuedMediator()
+    c1 = mediator.register("component1", Component1())
+    c2 = mediator.register("component2", Component2())
+    mediator.add_route("A", lambda sender, event: mediator["component2"].do_c())
+    mediator.add_route("C", lambda sender, event: mediator["component1"].do_a())
+    mediator.add_route("D", lambda sender, event: mediator["component1"].do_b())
+    mediator.add_route("D", lambda sender, event: mediator["component2"].do_c())
+
+    print("Client triggers a cycle of A and C through the queued mediator.")
+    c1.do_a()
+
+    print("\n", end="")
+
+    print("Client triggers D on the async mediator.")
+    asyncio.run(async_client_code())
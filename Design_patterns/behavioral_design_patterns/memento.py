@@ -8,10 +8,18 @@ capture and externalize an object’s internal state.
 """
 
 from __future__ import annotations
+import mmap
+import struct
+import sys
 from abc import ABC, abstractmethod
+from bisect import bisect_right
 from datetime import datetime
 from random import sample
 from string import ascii_letters
+from typing import Iterator, List, Optional, Tuple, Union
+
+# (common prefix length, common suffix length, replaced middle)
+Delta = Tuple[int, int, str]
 
 
 class Originator:
@@ -52,9 +60,9 @@ class Memento(ABC):
 
 
 class ConcreteMemento(Memento):
-    def __init__(self, state: str) -> None:
+    def __init__(self, state: str, date: Optional[str] = None) -> None:
         self._state = state
-        self._date = str(datetime.now())[:19]
+        self._date = date or str(datetime.now())[:19]
 
     def get_state(self) -> str:
         return self._state
@@ -66,33 +74,310 @@ class ConcreteMemento(Memento):
         return self._date
 
 
+def _diff(old: str, new: str) -> Delta:
+    limit = min(len(old), len(new))
+    prefix = 0
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+
+    suffix = 0
+    while suffix < limit - prefix and old[-suffix - 1] == new[-suffix - 1]:
+        suffix += 1
+
+    return prefix, suffix, new[prefix : len(new) - suffix]
+
+
+def _patch(old: str, delta: Delta) -> str:
+    prefix, suffix, middle = delta
+    return old[:prefix] + middle + old[len(old) - suffix :]
+
+
+class HistoryStore:
+    """
+    Keeps a full snapshot every `keyframe_interval` entries and deltas
+    in between. Oldest segments are evicted once `max_bytes` is exceeded.
+    """
+
+    def __init__(self, keyframe_interval: int = 16, max_bytes: int = None) -> None:
+        self._keyframe_interval = keyframe_interval
+        self._max_bytes = max_bytes
+        self._entries: List[Optional[Tuple[str, Union[str, Delta]]]] = []
+        self._keyframes: List[int] = []
+        self._start = 0
+        self._keyframes_start = 0
+        self._bytes = 0
+        self._last_state: Optional[str] = None
+
+    @staticmethod
+    def _sizeof(payload: Union[str, Delta]) -> int:
+        if isinstance(payload, str):
+            return sys.getsizeof(payload)
+        return sys.getsizeof(payload) + sys.getsizeof(payload[2])
+
+    def __len__(self) -> int:
+        return len(self._entries) - self._start
+
+    def append(self, memento: Memento) -> None:
+        state = memento.get_state()
+        position = len(self._entries)
+
+        if not len(self) or position - self._keyframes[-1] >= self._keyframe_interval:
+            payload = state
+            self._keyframes.append(position)
+        else:
+            payload = _diff(self._last_state, state)
+
+        self._entries.append((memento.get_date(), payload))
+        self._bytes += self._sizeof(payload)
+        self._last_state = state
+        self._evict()
+
+    def _evict(self) -> None:
+        if self._max_bytes is None:
+            return
+
+        # Whole segments go at once, so the oldest entry is always a keyframe.
+        while (
+            self._bytes > self._max_bytes
+            and len(self._keyframes) - self._keyframes_start > 1
+        ):
+            end = self._keyframes[self._keyframes_start + 1]
+            for position in range(self._start, end):
+                self._bytes -= self._sizeof(self._entries[position][1])
+                self._entries[position] = None
+            self._start = end
+            self._keyframes_start += 1
+
+        if self._start > len(self._entries) // 2:
+            self._entries = self._entries[self._start :]
+            self._keyframes = [
+                keyframe - self._start
+                for keyframe in self._keyframes[self._keyframes_start :]
+            ]
+            self._start = 0
+            self._keyframes_start = 0
+
+    def _state_at(self, position: int) -> str:
+        index = bisect_right(self._keyframes, position, lo=self._keyframes_start) - 1
+        keyframe = self._keyframes[index]
+        state = self._entries[keyframe][1]
+        for offset in range(keyframe + 1, position + 1):
+            state = _patch(state, self._entries[offset][1])
+        return state
+
+    def __getitem__(self, index: int) -> Memento:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+
+        position = self._start + index
+        return ConcreteMemento(self._state_at(position), self._entries[position][0])
+
+    def pop(self) -> Memento:
+        memento = self[-1]
+        position = len(self._entries) - 1
+
+        self._bytes -= self._sizeof(self._entries.pop()[1])
+        if self._keyframes[-1] == position:
+            self._keyframes.pop()
+        self._last_state = self._state_at(position - 1) if len(self) else None
+        return memento
+
+    def __iter__(self) -> Iterator[Memento]:
+        state = None
+        for date, payload in self._entries[self._start :]:
+            state = payload if isinstance(payload, str) else _patch(state, payload)
+            yield ConcreteMemento(state, date)
+
+
+class MappedMemento(Memento):
+    def __init__(self, buffer: memoryview, timestamp: float) -> None:
+        self._buffer = buffer
+        self._timestamp = timestamp
+
+    def get_state(self) -> str:
+        return str(self._buffer, "utf-8")
+
+    def get_name(self) -> str:
+        preview = str(self._buffer[:36], "utf-8", "ignore")[0:9]
+        return f"{self.get_date()} / ({preview}...)"
+
+    def get_date(self) -> str:
+        return str(datetime.fromtimestamp(self._timestamp))[:19]
+
+
+class FileHistoryStore:
+    """
+    Append-only memento log kept in two files: `<path>.dat` with the raw
+    states and `<path>.idx` with one fixed-size header per record.
+    Both are memory-mapped, so reads never copy states onto the heap
+    until the originator actually decodes them.
+    """
+
+    _header = struct.Struct("<dQI")  # timestamp, offset, length
+
+    def __init__(self, path: str) -> None:
+        self._index = open(f"{path}.idx", "a+b")
+        self._data = open(f"{path}.dat", "a+b")
+        self._index_map: Optional[mmap.mmap] = None
+        self._data_map: Optional[mmap.mmap] = None
+        self._count = self._index.seek(0, 2) // self._header.size
+        self._data_size = self._data.seek(0, 2)
+        # Drop a torn trailing header left behind by a crash.
+        self._index.truncate(self._count * self._header.size)
+
+    @staticmethod
+    def _map(file, current: Optional[mmap.mmap], size: int) -> Optional[mmap.mmap]:
+        if current is not None and len(current) >= size:
+            return current
+        # Outstanding mementos keep old maps alive, so they are not closed here.
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, memento: Memento) -> None:
+        state = memento.get_state().encode("utf-8")
+        timestamp = datetime.fromisoformat(memento.get_date()).timestamp()
+
+        self._data.write(state)
+        # The header goes last, a torn write leaves the record invisible.
+        self._data.flush()
+        self._index.write(self._header.pack(timestamp, self._data_size, len(state)))
+        self._index.flush()
+
+        self._data_size += len(state)
+        self._count += 1
+
+    def __getitem__(self, index: int) -> Memento:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("history index out of range")
+
+        self._index_map = self._map(
+            self._index, self._index_map, self._count * self._header.size
+        )
+        self._data_map = self._map(self._data, self._data_map, self._data_size)
+
+        timestamp, offset, length = self._header.unpack_from(
+            self._index_map, index * self._header.size
+        )
+        if not length:
+            # Nothing to map, and an empty data file cannot be mapped at all.
+            return MappedMemento(memoryview(b""), timestamp)
+
+        buffer = memoryview(self._data_map)[offset : offset + length]
+        return MappedMemento(buffer, timestamp)
+
+    def pop(self) -> Memento:
+        memento = self[-1]
+        # Popped states stay in the data file, only the index shrinks.
+        self._count -= 1
+        self._index.truncate(self._count * self._header.size)
+        return ConcreteMemento(memento.get_state(), memento.get_date())
+
+    def __iter__(self) -> Iterator[Memento]:
+        for index in range(self._count):
+            yield self[index]
+
+    def close(self) -> None:
+        for mapped in (self._index_map, self._data_map):
+            if mapped is None:
+                continue
+            try:
+                mapped.close()
+            except BufferError:
+                # Outstanding mementos still view the map, it is released
+                # once the last of them is gone.
+                pass
+        self._index_map = self._data_map = None
+        self._index.close()
+        self._data.close()
+
+
 class Caretaker:
-    def __init__(self, originator: Originator) -> None:
-        self._mementos: list[Memento] = []
+    def __init__(
+        self,
+        originator: Originator,
+        history: Union[HistoryStore, FileHistoryStore, None] = None,
+    ) -> None:
+        self._mementos = history if history is not None else HistoryStore()
+        self._redo: List[Memento] = []
         self._originator = originator
 
     def backup(self) -> None:
         print("\nCaretaker: Saving Originator's state...")
         self._mementos.append(self._originator.save())
+        self._redo.clear()
 
-    def undo(self) -> None:
-        if not len(self._mementos):
+    def undo(self, steps: int = 1) -> None:
+        if not len(self._mementos) or steps < 1:
             return
 
-        memento = self._mementos.pop()
+        # States jumped over are not restored, only kept for redo().
+        skipped = [self._originator.save()]
+        for _ in range(min(steps, len(self._mementos)) - 1):
+            skipped.append(self._mementos.pop())
+
+        while len(self._mementos):
+            memento = self._mementos.pop()
+            print(f"Caretaker: Restoring state to: {memento.get_name()}")
+            try:
+                self._originator.restore(memento)
+            except Exception:
+                print("Caretaker: Memento could not be restored, skipping it.")
+                continue
+
+            self._redo.extend(skipped)
+            return
+
+    def redo(self, steps: int = 1) -> None:
+        if not self._redo or steps < 1:
+            return
+
+        self._mementos.append(self._originator.save())
+        for _ in range(min(steps, len(self._redo)) - 1):
+            self._mementos.append(self._redo.pop())
+
+        memento = self._redo.pop()
+        print(f"Caretaker: Redoing state: {memento.get_name()}")
+        self._originator.restore(memento)
+
+    def rewind_to(self, timestamp: str) -> None:
+        mementos = self._mementos
+        index = bisect_right(
+            range(len(mementos)), timestamp, key=lambda i: mementos[i].get_date()
+        )
+        if not index:
+            print(f"Caretaker: Nothing was saved before {timestamp}.")
+            return
+
+        self.undo(len(mementos) - index + 1)
+
+    def restore_to(self, index: int) -> None:
+        memento = self._mementos[index]
         print(f"Caretaker: Restoring state to: {memento.get_name()}")
-        try:
-            self._originator.restore(memento)
-        except Exception:
-            self.undo()
+        self._originator.restore(memento)
 
-    def show_history(self) -> None:
+    def show_history(self, page: int = 0, page_size: Optional[int] = None) -> None:
         print("Caretaker: List of mementos:")
-        for memento in self._mementos:
-            print(memento.get_name())
+        if page_size is None:
+            for memento in self._mementos:
+                print(memento.get_name())
+            return
+
+        # Only the entries on the page are built, earlier ones are skipped.
+        stop = min(len(self._mementos), (page + 1) * page_size)
+        for index in range(page * page_size, stop):
+            print(self._mementos[index].get_name())
 
 
 if __name__ == "__main__":
+    import os
+    import tempfile
+
     originator = Originator("State_state")
     caretaker = Caretaker(originator)
 
@@ -113,3 +398,36 @@ if __name__ == "__main__":
 
     print("\nClient: Doing rollback again...\n")
     caretaker.undo()
+
+    print("\nClient: Redoing both rollbacks at once...\n")
+    caretaker.redo(2)
+
+    timestamp = caretaker._mementos[0].get_date()
+    print(f"\nClient: Rewinding to the last backup made by {timestamp}...\n")
+    caretaker.rewind_to(timestamp)
+
+    print("\nClient: Keeping a bounded, delta-encoded history...\n")
+    caretaker = Caretaker(originator, HistoryStore(keyframe_interval=2, max_bytes=400))
+    for _ in range(6):
+        caretaker.backup()
+        originator.do_something()
+
+    print()
+    caretaker.show_history()
+
+    print("\nClient: Jumping back to the oldest kept state...\n")
+    caretaker.restore_to(0)
+
+    print("\nClient: Spilling history to a memory-mapped log...\n")
+    path = os.path.join(tempfile.mkdtemp(), "history")
+    history = FileHistoryStore(path)
+    caretaker = Caretaker(originator, history)
+    for _ in range(5):
+        caretaker.backup()
+        originator.do_something()
+    history.close()
+
+    print("\nClient: Reopening the log after a restart...\n")
+    caretaker = Caretaker(originator, FileHistoryStore(path))
+    caretaker.show_history(page=1, page_size=2)
+    caretaker.undo()
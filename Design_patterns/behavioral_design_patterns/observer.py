@@ -12,9 +12,18 @@ updated automatically.
 """
 
 from __future__ import annotations
+import asyncio
+import threading
 from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import contextmanager
+from enum import Enum
 from random import randrange
-from typing import List
+from time import sleep
+from typing import Callable, Dict, Iterator, List, Optional
+from weakref import WeakKeyDictionary
+
+STATE_CHANGED = "state_changed"
 
 
 class Subject(ABC):
@@ -34,26 +43,148 @@ class Subject(ABC):
 class ConcreteSubject(Subject):
     _state: int = None
 
-    _observers: List[Observer] = []  # {"event_type": ["subcribers",]}
+    _states = range(0, 10)
+
+    def __init__(self) -> None:
+        # {"event_type": {observer: predicate}}, weak so dead observers drop out
+        # on their own. A predicate bound to its own observer would keep it
+        # alive, pass plain functions. Attached observers accept every state.
+        self._subscriptions: Dict[
+            str, WeakKeyDictionary[Observer, Optional[Callable[[int], bool]]]
+        ] = defaultdict(WeakKeyDictionary)
+        # {"event_type": {state: {subscriber: None}}}, precomputed over _states
+        self._dispatch: Dict[str, Dict[int, WeakKeyDictionary[Observer, None]]] = (
+            defaultdict(lambda: {state: WeakKeyDictionary() for state in self._states})
+        )
+        # States collected since the last notification, readable during update()
+        self._deltas: List[int] = []
+        self._batch_depth = 0
+        self._window_size: Optional[int] = None
+        self._window_delay: Optional[float] = None
+        self._window_timer: Optional[threading.Timer] = None
+        self._lock = threading.RLock()
 
     def attach(self, observer: Observer) -> None:
         print("Subject: Attached an observer.")
-        self._observers.append(observer)
+        self._subscribe(observer, STATE_CHANGED, None)
 
     def detach(self, observer: Observer) -> None:
-        self._observers.remove(observer)
+        self.unsubscribe(observer, STATE_CHANGED)
 
-    def notify(self) -> None:
+    def subscribe(
+        self,
+        observer: Observer,
+        event_type: str = STATE_CHANGED,
+        predicate: Optional[Callable[[int], bool]] = None,
+    ) -> None:
+        print(f"Subject: Subscribed an observer to {event_type}.")
+        self._subscribe(observer, event_type, predicate)
+
+    def _subscribe(
+        self,
+        observer: Observer,
+        event_type: str,
+        predicate: Optional[Callable[[int], bool]],
+    ) -> None:
+        self.unsubscribe(observer, event_type)
+        self._subscriptions[event_type][observer] = predicate
+
+        # Only the buckets of the states this observer accepts are touched.
+        for state, subscribers in self._dispatch[event_type].items():
+            if predicate is None or predicate(state):
+                subscribers[observer] = None
+
+    def unsubscribe(self, observer: Observer, event_type: str = STATE_CHANGED) -> None:
+        if observer not in self._subscriptions[event_type]:
+            return
+
+        del self._subscriptions[event_type][observer]
+
+        for subscribers in self._dispatch[event_type].values():
+            subscribers.pop(observer, None)
+
+    def _matching(self, event_type: str) -> List[Observer]:
+        table = self._dispatch.get(event_type)
+        if table is None:
+            return []
+        if self._state in table:
+            return list(table[self._state])
+
+        # State outside of the precomputed domain, evaluate predicates directly.
+        return [
+            observer
+            for observer, predicate in list(self._subscriptions[event_type].items())
+            if predicate is None or predicate(self._state)
+        ]
+
+    def notify(self, event_type: str = STATE_CHANGED) -> None:
         print("Subject: Notifying observers...")
-        for observer in self._observers:
+        for observer in self._matching(event_type):
             observer.update(self)
 
+    @contextmanager
+    def batch(self) -> Iterator[ConcreteSubject]:
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.flush()
+
+    def set_coalescing(
+        self, max_size: Optional[int] = None, max_delay: Optional[float] = None
+    ) -> None:
+        self.flush()
+        self._window_size = max_size
+        self._window_delay = max_delay
+
+    def _coalescing(self) -> bool:
+        return self._window_size is not None or self._window_delay is not None
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._window_timer is not None:
+                self._window_timer.cancel()
+                self._window_timer = None
+            if not self._deltas:
+                return
+
+            print(f"Subject: Coalesced {len(self._deltas)} state changes.")
+            self.notify()
+            self._deltas = []
+
+    def _open_window(self) -> None:
+        # A time window closes on its own, notify() then runs on the timer thread.
+        if self._window_delay is None or self._batch_depth:
+            return
+        self._window_timer = threading.Timer(self._window_delay, self.flush)
+        self._window_timer.daemon = True
+        self._window_timer.start()
+
+    def _set_state(self, state: int) -> None:
+        with self._lock:
+            self._state = state
+            print(f"Subject: My state has just changed to: {self._state}")
+
+            if not self._batch_depth and not self._coalescing():
+                self.notify()
+                return
+
+            if not self._deltas:
+                self._open_window()
+            self._deltas.append(state)
+
+            if (
+                not self._batch_depth
+                and self._window_size is not None
+                and len(self._deltas) >= self._window_size
+            ):
+                self.flush()
+
     def some_business_logic(self) -> None:
         print("\nSubject: I'm doing something important.")
-        self._state = randrange(0, 10)
-
-        print(f"Subject: My state has just changed to: {self._state}")
-        self.notify()
+        self._set_state(randrange(0, 10))
 
 
 class Observer(ABC):
@@ -63,17 +194,138 @@ class Observer(ABC):
 
 
 class ConcreteObserverA(Observer):
+    @staticmethod
+    def accepts(state: int) -> bool:
+        return state < 3
+
     def update(self, subject: ConcreteSubject) -> None:
-        if subject._state < 3:
+        if self.accepts(subject._state):
             print("ConcreteObserverA: Reacted to the event")
 
 
 class ConcreteObserverB(Observer):
+    @staticmethod
+    def accepts(state: int) -> bool:
+        return state == 0 or state >= 2
+
     def update(self, subject: ConcreteSubject) -> None:
-        if subject._state == 0 or subject._state >= 2:
+        if self.accepts(subject._state):
             print("ConcreteObserverB: Reacted to the event")
 
 
+class DeltaObserver(Observer):
+    def update(self, subject: ConcreteSubject) -> None:
+        print(f"DeltaObserver: Final state {subject._state}, deltas {subject._deltas}")
+
+
+class BackpressurePolicy(Enum):
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    COALESCE = "coalesce"
+
+
+class AsyncObserver(ABC):
+    @abstractmethod
+    async def update(self, state: int) -> None:
+        pass
+
+
+class AsyncConcreteSubject(Subject):
+    _state: int = None
+
+    def __init__(
+        self,
+        maxsize: int = 16,
+        policy: BackpressurePolicy = BackpressurePolicy.DROP_OLDEST,
+    ) -> None:
+        self._maxsize = maxsize
+        self._policy = policy
+        self._queues: Dict[AsyncObserver, asyncio.Queue] = {}
+        self._workers: Dict[AsyncObserver, asyncio.Task] = {}
+
+    def attach(self, observer: AsyncObserver) -> None:
+        print("AsyncSubject: Attached an observer.")
+        queue = asyncio.Queue(maxsize=self._maxsize)
+        self._queues[observer] = queue
+        self._workers[observer] = asyncio.create_task(self._consume(observer, queue))
+
+    def detach(self, observer: AsyncObserver) -> None:
+        self._queues.pop(observer)
+        self._workers.pop(observer).cancel()
+
+    async def _consume(self, observer: AsyncObserver, queue: asyncio.Queue) -> None:
+        while True:
+            state = await queue.get()
+            try:
+                await observer.update(state)
+            except Exception as error:
+                # One failing update must not stop the worker, or the queue
+                # would fill up and block the producer.
+                print(f"AsyncSubject: {type(observer).__name__} failed: {error!r}")
+            finally:
+                queue.task_done()
+
+    async def _put(self, queue: asyncio.Queue, state: int) -> None:
+        if self._policy is BackpressurePolicy.BLOCK:
+            await queue.put(state)
+            return
+
+        if self._policy is BackpressurePolicy.COALESCE:
+            # Pending states are superseded, only the latest one is delivered.
+            while not queue.empty():
+                queue.get_nowait()
+                queue.task_done()
+        elif queue.full():
+            queue.get_nowait()
+            queue.task_done()
+
+        queue.put_nowait(state)
+
+    async def notify(self) -> None:
+        print("AsyncSubject: Notifying observers...")
+        for queue in list(self._queues.values()):
+            await self._put(queue, self._state)
+
+    async def drain(self) -> None:
+        await asyncio.gather(*(queue.join() for queue in self._queues.values()))
+
+    async def close(self) -> None:
+        for worker in self._workers.values():
+            worker.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._queues.clear()
+        self._workers.clear()
+
+    async def some_business_logic(self) -> None:
+        self._state = randrange(0, 10)
+        print(f"AsyncSubject: My state has just changed to: {self._state}")
+        await self.notify()
+
+
+class FastAsyncObserver(AsyncObserver):
+    async def update(self, state: int) -> None:
+        print(f"FastAsyncObserver: Reacted to {state}")
+
+
+class SlowAsyncObserver(AsyncObserver):
+    async def update(self, state: int) -> None:
+        await asyncio.sleep(0.1)
+        print(f"SlowAsyncObserver: Reacted to {state}")
+
+
+async def async_client_code(policy: BackpressurePolicy) -> None:
+    print(f"\nClient: Bursting state changes with {policy.value} policy.")
+    subject = AsyncConcreteSubject(maxsize=2, policy=policy)
+    subject.attach(FastAsyncObserver())
+    subject.attach(SlowAsyncObserver())
+
+    for _ in range(5):
+        await subject.some_business_logic()
+
+    await subject.drain()
+    await subject.close()
+
+
 if __name__ == "__main__":
     subject = ConcreteSubject()
 
@@ -89,3 +341,36 @@ if __name__ == "__main__":
     subject.detach(observer_a)
 
     subject.some_business_logic()
+
+    print("\nClient: Subscribing observers by event type and state predicate.")
+    subject.subscribe(observer_a, STATE_CHANGED, ConcreteObserverA.accepts)
+    subject.subscribe(observer_b, STATE_CHANGED, ConcreteObserverB.accepts)
+
+    subject.some_business_logic()
+
+    subject.unsubscribe(observer_a)
+
+    subject.some_business_logic()
+
+    print("\nClient: Applying a burst of updates in a batch.")
+    observer_c = DeltaObserver()
+    subject.attach(observer_c)
+
+    with subject.batch():
+        for _ in range(3):
+            subject.some_business_logic()
+
+    print("\nClient: Coalescing every 2 updates.")
+    subject.set_coalescing(max_size=2)
+    for _ in range(4):
+        subject.some_business_logic()
+
+    print("\nClient: Coalescing updates within 0.05s.")
+    subject.set_coalescing(max_delay=0.05)
+    for _ in range(2):
+        subject.some_business_logic()
+    sleep(0.1)
+    subject.set_coalescing()
+
+    for policy in BackpressurePolicy:
+        asyncio.run(async_client_code(policy))
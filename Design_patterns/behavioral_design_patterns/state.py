@@ -12,6 +12,7 @@ from the pattern’s superclass.
 
 from __future__ import annotations
 from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Sequence, Tuple, Type
 
 
 class Context:
@@ -25,14 +26,24 @@ class Context:
         self._state = state
         self._state.context = self
 
+    def _handle(self, event: str) -> None:
+        state = self._state
+        getattr(state, event)()
+        target = state.transitions.get(event)
+        if target is not None:
+            self.transition_to(target())
+
     def request1(self):
-        self._state.handle1()
+        self._handle("handle1")
 
     def request2(self):
-        self._state.handle2()
+        self._handle("handle2")
 
 
 class State(ABC):
+    # {"event": state it leads to}, events missing here keep the state
+    transitions: Dict[str, Type[State]] = {}
+
     @property
     def context(self) -> Context:
         return self._context
@@ -54,7 +65,6 @@ class ConcreteStateA(State):
     def handle1(self) -> None:
         print("ConcreteStateA handles request1.")
         print("ConcreteStateA wants to change the state of the context.")
-        self.context.transition_to(ConcreteStateB())
 
     def handle2(self) -> None:
         print("ConcreteStateA handles request2.")
@@ -67,10 +77,157 @@ class ConcreteStateB(State):
     def handle2(self) -> None:
         print("ConcreteStateB handles request2.")
         print("ConcreteStateB wants to change the state of the context.")
-        self.context.transition_to(ConcreteStateA())
+
+
+ConcreteStateA.transitions = {"handle1": ConcreteStateB}
+ConcreteStateB.transitions = {"handle2": ConcreteStateA}
+
+
+class StateMachine:
+    def __init__(self, states: Sequence[Type[State]], initial: Type[State]) -> None:
+        self._states: List[Type[State]] = list(states)
+        self._state_ids: Dict[Type[State], int] = {
+            state: state_id for state_id, state in enumerate(self._states)
+        }
+        self._events: List[str] = sorted(State.__abstractmethods__)
+        self._event_ids: Dict[str, int] = {
+            event: event_id for event_id, event in enumerate(self._events)
+        }
+        self._table: List[Tuple[int, ...]] = self._compile()
+        self._current = self._state_ids[initial]
+
+    def _compile(self) -> List[Tuple[int, ...]]:
+        return [
+            tuple(
+                self._state_ids[state.transitions.get(event, state)]
+                for event in self._events
+            )
+            for state in self._states
+        ]
+
+    @property
+    def state(self) -> Type[State]:
+        return self._states[self._current]
+
+    @property
+    def current(self) -> int:
+        return self._current
+
+    @property
+    def states(self) -> List[Type[State]]:
+        return self._states
+
+    @property
+    def table(self) -> List[Tuple[int, ...]]:
+        return self._table
+
+    def state_id(self, state: Type[State]) -> int:
+        return self._state_ids[state]
+
+    def event_ids(self, events: Iterable[str]) -> List[int]:
+        return [self._event_ids[event] for event in events]
+
+    def feed(self, events: Iterable[int]) -> int:
+        # Only tracks the state, handlers are not run.
+        table = self._table
+        size = len(self._events)
+        current = self._current
+        for event in events:
+            if not 0 <= event < size:
+                self._current = current
+                raise ValueError(f"event ids must be between 0 and {size - 1}")
+            current = table[current][event]
+        self._current = current
+        return current
+
+
+class BatchStateMachine:
+    """
+    Steps many entities through the same compiled table at once. States are
+    kept one byte per entity, so a whole step is a single bytes.translate().
+    """
+
+    def __init__(self, machine: StateMachine, size: int) -> None:
+        table = machine.table
+        if len(table) > 256:
+            raise ValueError("BatchStateMachine supports at most 256 states")
+
+        self._machine = machine
+        self._events = len(table[0])
+        self._states = bytes([machine.current]) * size
+        # One translation table per event: state -> next state
+        self._columns: List[bytes] = [
+            self._translation([row[event] for row in table])
+            for event in range(self._events)
+        ]
+        # Translation tables over combined codes: state * events + event
+        self._offsets: bytes = None
+        self._combined: bytes = None
+        if len(table) * self._events <= 256:
+            self._offsets = self._translation(
+                [state * self._events for state in range(len(table))]
+            )
+            self._combined = self._translation(
+                [target for row in table for target in row]
+            )
+
+    @staticmethod
+    def _translation(values: List[int]) -> bytes:
+        return bytes(values) + bytes(256 - len(values))
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def step(self, event: int) -> None:
+        if not 0 <= event < self._events:
+            raise ValueError(f"event ids must be between 0 and {self._events - 1}")
+        self._states = self._states.translate(self._columns[event])
+
+    def step_each(self, events: bytes) -> None:
+        if len(events) != len(self._states):
+            raise ValueError("one event per entity is required")
+        if events and max(events) >= self._events:
+            raise ValueError(f"event ids must be below {self._events}")
+
+        if self._combined is None:
+            table = self._machine.table
+            self._states = bytes(
+                table[state][event] for state, event in zip(self._states, events)
+            )
+            return
+
+        # Codes never exceed 255, so adding the byte strings as big integers
+        # never carries between entities.
+        size = len(self._states)
+        offsets = self._states.translate(self._offsets)
+        codes = int.from_bytes(offsets, "little") + int.from_bytes(events, "little")
+        self._states = codes.to_bytes(size, "little").translate(self._combined)
+
+    def state_of(self, entity: int) -> Type[State]:
+        return self._machine.states[self._states[entity]]
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            state.__name__: self._states.count(state_id)
+            for state_id, state in enumerate(self._machine.states)
+        }
 
 
 if __name__ == "__main__":
     context = Context(ConcreteStateA())
     context.request1()
     context.request2()
+
+    machine = StateMachine([ConcreteStateA, ConcreteStateB], initial=ConcreteStateA)
+    print(f"\nStateMachine: Compiled transition table {machine.table}")
+
+    events = machine.event_ids(["handle1", "handle2", "handle1"] * 100_000)
+    machine.feed(events)
+    print(f"StateMachine: After {len(events)} events in {machine.state.__name__}")
+
+    batch = BatchStateMachine(machine, 1_000_000)
+    batch.step(machine.event_ids(["handle1"])[0])
+    print(f"BatchStateMachine: {batch.counts()}")
+
+    batch.step_each(bytes(machine.event_ids(["handle1", "handle2"])) * 500_000)
+    print(f"BatchStateMachine: {batch.counts()}")
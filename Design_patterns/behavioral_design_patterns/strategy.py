@@ -10,8 +10,20 @@ method is also called as Policy Method.
 """
 
 from __future__ import annotations
+import heapq
+import os
+import pickle
+import tempfile
 from abc import ABC, abstractmethod
-from typing import List
+from array import array
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from multiprocessing.shared_memory import SharedMemory
+from random import choices, randrange
+from string import ascii_lowercase
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
 
 
 class Context:
@@ -26,19 +38,33 @@ class Context:
     def strategy(self, strategy: Strategy) -> None:
         self._strategy = strategy
 
-    def do_some_business_logic(self) -> None:
+    def execute(self, data: List) -> List:
+        return self._strategy.do_algorithm(data)
+
+    def do_some_business_logic(self, data: Optional[List] = None) -> None:
         print("Context: Sorting data using the strategy (not sure how it'll do it)")
-        result = self._strategy.do_algorithm(["a", "b", "c", "d", "e"])
-        print(",".join(result))
+        if data is None:
+            data = ["a", "b", "c", "d", "e"]
+        result = self.execute(data)
+        print(",".join(map(str, result)))
 
 
 class Strategy(ABC):
+    # Combines the results of do_algorithm() on consecutive chunks, strategies
+    # that can run in parallel provide it as a method.
+    merge: Optional[Callable[[List[List]], List]] = None
+
     @abstractmethod
     def do_algorithm(self, data: List):
         pass
 
 
-class ConcreteStrategyA(Strategy):
+class SortStrategy(Strategy):
+    def merge(self, parts: List[List]) -> List:
+        return list(heapq.merge(*parts))
+
+
+class ConcreteStrategyA(SortStrategy):
     def do_algorithm(self, data: List) -> List:
         return sorted(data)
 
@@ -47,6 +73,273 @@ class ConcreteStrategyB(Strategy):
     def do_algorithm(self, data: List) -> List:
         return sorted(data, reverse=True)
 
+    def merge(self, parts: List[List]) -> List:
+        return list(heapq.merge(*parts, reverse=True))
+
+
+class InPlaceStrategy(SortStrategy):
+    def do_algorithm(self, data: List) -> List:
+        data.sort()
+        return data
+
+
+class KeyCachedStrategy(Strategy):
+    def __init__(self, key: Callable[[Any], Any]) -> None:
+        self._key = key
+
+    def do_algorithm(self, data: List) -> List:
+        # Decorate-sort-undecorate, the index keeps it stable and avoids
+        # ever comparing the items themselves.
+        decorated = [(self._key(item), index, item) for index, item in enumerate(data)]
+        decorated.sort()
+        return [item for _, _, item in decorated]
+
+    def merge(self, parts: List[List]) -> List:
+        return list(heapq.merge(*parts, key=self._key))
+
+
+class CountingStrategy(SortStrategy):
+    # Counting walks every value in the range, so it only pays off while the
+    # range stays within `density` values per item.
+    density = 4
+
+    def __init__(self, max_range: int = 1 << 16) -> None:
+        self._max_range = max_range
+
+    @classmethod
+    def is_dense(cls, data: List) -> bool:
+        return max(data) - min(data) <= cls.density * len(data)
+
+    def do_algorithm(self, data: List) -> List:
+        if not data:
+            return []
+
+        low, high = min(data), max(data)
+        if high - low > min(self._max_range, self.density * len(data)):
+            return sorted(data)
+
+        counts = Counter(data)
+        result = []
+        for value in range(low, high + 1):
+            if value in counts:
+                result.extend([value] * counts[value])
+        return result
+
+
+class RadixStrategy(SortStrategy):
+    def __init__(self, max_length: int = 8) -> None:
+        self._max_length = max_length
+
+    def do_algorithm(self, data: List) -> List:
+        width = max(map(len, data), default=0)
+        if width > self._max_length:
+            return sorted(data)
+
+        # LSD radix sort, shorter strings sort before their extensions
+        # because a missing character maps to bucket 0.
+        for position in range(width - 1, -1, -1):
+            buckets: Dict[int, List[str]] = {}
+            for word in data:
+                code = ord(word[position]) + 1 if position < len(word) else 0
+                buckets.setdefault(code, []).append(word)
+            data = [word for code in sorted(buckets) for word in buckets[code]]
+        return list(data)
+
+
+class ExternalMergeSortStrategy(SortStrategy):
+    def __init__(self, chunk_size: int = 100_000, directory: str = None) -> None:
+        self._chunk_size = chunk_size
+        self._directory = directory
+
+    def _spill(self, chunk: List) -> str:
+        chunk.sort()
+        fd, path = tempfile.mkstemp(dir=self._directory, suffix=".run")
+        with os.fdopen(fd, "wb") as run:
+            for item in chunk:
+                pickle.dump(item, run)
+        return path
+
+    @staticmethod
+    def _read(path: str) -> Iterator:
+        with open(path, "rb") as run:
+            while True:
+                try:
+                    yield pickle.load(run)
+                except EOFError:
+                    return
+
+    def sort_iter(self, data: Iterable) -> Iterator:
+        items = iter(data)
+        paths = []
+        try:
+            while chunk := list(islice(items, self._chunk_size)):
+                paths.append(self._spill(chunk))
+            yield from heapq.merge(*(self._read(path) for path in paths))
+        finally:
+            for path in paths:
+                os.remove(path)
+
+    def do_algorithm(self, data: Iterable) -> List:
+        return list(self.sort_iter(data))
+
+
+class TopKStrategy(Strategy):
+    def __init__(self, k: int) -> None:
+        self._k = k
+
+    def do_algorithm(self, data: List) -> List:
+        return heapq.nsmallest(self._k, data)
+
+    def merge(self, parts: List[List]) -> List:
+        return list(islice(heapq.merge(*parts), self._k))
+
+
+class AutoStrategy(SortStrategy):
+    _calibration: Dict[str, Strategy] = {}
+
+    def __init__(
+        self, small_threshold: int = 64, external_threshold: int = 10_000_000
+    ) -> None:
+        self._small_threshold = small_threshold
+        self._external_threshold = external_threshold
+
+    @staticmethod
+    def _time(strategy: Strategy, sample: List) -> float:
+        started = perf_counter()
+        strategy.do_algorithm(list(sample))
+        return perf_counter() - started
+
+    @classmethod
+    def calibrate(cls, sample_size: int = 20_000) -> Dict[str, Strategy]:
+        samples = {
+            "int": [randrange(0, 1000) for _ in range(sample_size)],
+            "str": ["".join(choices(ascii_lowercase, k=4)) for _ in range(sample_size)],
+        }
+        candidates = {
+            "int": [InPlaceStrategy(), CountingStrategy()],
+            "str": [InPlaceStrategy(), RadixStrategy()],
+        }
+
+        for kind, strategies in candidates.items():
+            cls._calibration[kind] = min(
+                strategies, key=lambda strategy: cls._time(strategy, samples[kind])
+            )
+
+        cls._calibration["other"] = InPlaceStrategy()
+        return cls._calibration
+
+    @staticmethod
+    def _kind(data: List) -> str:
+        if all(type(item) is int for item in data):
+            return "int" if CountingStrategy.is_dense(data) else "other"
+        if all(type(item) is str and len(item) <= 8 for item in data):
+            return "str"
+        return "other"
+
+    def choose(self, data: List) -> Strategy:
+        if len(data) < self._small_threshold:
+            return InPlaceStrategy()
+        if len(data) > self._external_threshold:
+            return ExternalMergeSortStrategy()
+        if not self._calibration:
+            self.calibrate()
+        return self._calibration[self._kind(data)]
+
+    def do_algorithm(self, data: List) -> List:
+        return self.choose(data).do_algorithm(list(data))
+
+
+def _run_chunk(strategy: Strategy, chunk: List) -> List:
+    return strategy.do_algorithm(chunk)
+
+
+def _run_shared_chunk(strategy: Strategy, name: str, start: int, stop: int) -> int:
+    # The result overwrites the chunk in place, only its length travels back.
+    memory = SharedMemory(name=name)
+    try:
+        # The cast view must be released before close(), even on errors.
+        with memory.buf.cast("q") as view:
+            result = strategy.do_algorithm(view[start:stop].tolist())
+            view[start : start + len(result)] = array("q", result)
+            return len(result)
+    finally:
+        memory.close()
+
+
+class ParallelContext(Context):
+    def __init__(
+        self,
+        strategy: Strategy,
+        workers: Optional[int] = None,
+        chunk_size: int = 1_000_000,
+        use_threads: bool = False,
+    ) -> None:
+        super().__init__(strategy)
+        self._workers = workers or os.cpu_count()
+        self._chunk_size = chunk_size
+        self._use_threads = use_threads
+        self._executor: Executor = (
+            ThreadPoolExecutor(self._workers)
+            if use_threads
+            else ProcessPoolExecutor(self._workers)
+        )
+
+    def _bounds(self, size: int) -> List[range]:
+        chunk_size = max(self._chunk_size, -(-size // self._workers))
+        return [
+            range(start, min(start + chunk_size, size))
+            for start in range(0, size, chunk_size)
+        ]
+
+    @staticmethod
+    def _shareable(data: List) -> bool:
+        return all(type(item) is int and -(1 << 63) <= item < 1 << 63 for item in data)
+
+    def execute(self, data: List) -> List:
+        bounds = self._bounds(len(data))
+        if len(bounds) < 2:
+            return self._strategy.do_algorithm(data)
+        if self._strategy.merge is None:
+            raise TypeError(
+                f"{type(self._strategy).__name__} can't run in parallel without a merge"
+            )
+
+        if self._use_threads or not self._shareable(data):
+            parts = list(
+                self._executor.map(
+                    _run_chunk,
+                    [self._strategy] * len(bounds),
+                    [data[bound.start : bound.stop] for bound in bounds],
+                )
+            )
+            return self._strategy.merge(parts)
+
+        return self._strategy.merge(self._execute_shared(data, bounds))
+
+    def _execute_shared(self, data: List, bounds: List[range]) -> List[List]:
+        buffer = array("q", data)
+        memory = SharedMemory(create=True, size=max(len(buffer) * buffer.itemsize, 1))
+        try:
+            with memory.buf.cast("q") as view:
+                view[:] = buffer
+                lengths = self._executor.map(
+                    _run_shared_chunk,
+                    [self._strategy] * len(bounds),
+                    [memory.name] * len(bounds),
+                    [bound.start for bound in bounds],
+                    [bound.stop for bound in bounds],
+                )
+                return [
+                    view[bound.start : bound.start + length].tolist()
+                    for bound, length in zip(bounds, lengths)
+                ]
+        finally:
+            memory.close()
+            memory.unlink()
+
+    def close(self) -> None:
+        self._executor.shutdown()
+
 
 if __name__ == "__main__":
     context = Context(ConcreteStrategyA())
@@ -57,3 +350,29 @@ if __name__ == "__main__":
     print("Client: Strategy is set to reverse sorting.")
     context.strategy = ConcreteStrategyB()
     context.do_some_business_logic()
+    print()
+
+    print("Client: Strategy picks itself after a calibration benchmark.")
+    context.strategy = AutoStrategy()
+    for data in ([randrange(0, 100) for _ in range(100)], ["bb", "a", "cab", "ab"]):
+        print(f"AutoStrategy: Chose {type(context.strategy.choose(data)).__name__}")
+        context.do_some_business_logic(data)
+    print()
+
+    print("Client: Strategy sorts through temporary files.")
+    context.strategy = ExternalMergeSortStrategy(chunk_size=3)
+    context.do_some_business_logic([5, 3, 9, 1, 7, 2, 8])
+    print()
+
+    print("Client: Strategy keeps only the three smallest items.")
+    context.strategy = TopKStrategy(3)
+    context.do_some_business_logic([5, 3, 9, 1, 7, 2, 8])
+    print()
+
+    print("Client: Strategy runs on chunks across a process pool.")
+    data = [randrange(0, 1_000_000) for _ in range(200_000)]
+    parallel = ParallelContext(ConcreteStrategyA(), workers=4, chunk_size=50_000)
+    print(
+        f"ParallelContext: Sorted correctly: {parallel.execute(data) == sorted(data)}"
+    )
+    parallel.close()
@@ -10,18 +10,149 @@ code at different places by making certain changes. This leads to
 avoiding code duplication also.
 """
 
+import json
+import threading
+import tracemalloc
 from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from itertools import count
+from time import perf_counter, sleep, thread_time
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+
+@dataclass
+class StepStats:
+    calls: int = 0
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    allocated_bytes: int = 0
+    peak_bytes: int = 0
+
+
+class StepProfiler:
+    def __init__(self) -> None:
+        self.enabled = False
+        self._track_allocations = False
+        self._started_tracing = False
+        self._stats: Dict[str, StepStats] = {}
+        self._lock = threading.Lock()
+        # The tracemalloc peak is process-wide and resetting it for one step
+        # would lose it for any step still running, nested or on another
+        # thread. Each running step keeps the highest peak seen so far here.
+        self._peaks: Dict[int, int] = {}
+        self._tokens = count()
+
+    def enable(self, track_allocations: bool = False) -> None:
+        self._track_allocations = track_allocations
+        if track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def _record_peak(self) -> None:
+        _, peak = tracemalloc.get_traced_memory()
+        for token, highest in self._peaks.items():
+            self._peaks[token] = max(highest, peak)
+
+    def run_step(self, instance: object, step: str) -> None:
+        method = getattr(instance, step)
+        track_allocations = self._track_allocations
+        if track_allocations:
+            with self._lock:
+                self._record_peak()
+                tracemalloc.reset_peak()
+                memory_before, _ = tracemalloc.get_traced_memory()
+                token = next(self._tokens)
+                self._peaks[token] = memory_before
+        wall_started, cpu_started = perf_counter(), thread_time()
+
+        try:
+            method()
+        finally:
+            wall_time = perf_counter() - wall_started
+            cpu_time = thread_time() - cpu_started
+            with self._lock:
+                # Keyed by the class that defines the method, so overrides show
+                # up separately from the default implementation.
+                stats = self._stats.setdefault(method.__qualname__, StepStats())
+                stats.wall_time += wall_time
+                stats.cpu_time += cpu_time
+                stats.calls += 1
+                if track_allocations:
+                    memory_after, _ = tracemalloc.get_traced_memory()
+                    self._record_peak()
+                    peak = self._peaks.pop(token)
+                    stats.allocated_bytes += memory_after - memory_before
+                    stats.peak_bytes = max(stats.peak_bytes, peak - memory_before)
+
+    def run(self, instance: object, steps: Sequence[str]) -> None:
+        for step in steps:
+            self.run_step(instance, step)
+
+    @property
+    def stats(self) -> Dict[str, StepStats]:
+        return self._stats
+
+    def report(self) -> str:
+        lines = [
+            f"{'step':<36}{'calls':>8}{'wall ms':>12}{'cpu ms':>12}{'alloc B':>12}"
+        ]
+        for step, stats in sorted(
+            self._stats.items(), key=lambda item: item[1].wall_time, reverse=True
+        ):
+            lines.append(
+                f"{step:<36}{stats.calls:>8}{stats.wall_time * 1000:>12.3f}"
+                f"{stats.cpu_time * 1000:>12.3f}{stats.allocated_bytes:>12}"
+            )
+        return "\n".join(lines)
+
+    def to_json(self) -> str:
+        return json.dumps({step: asdict(stats) for step, stats in self._stats.items()})
+
+
+profiler = StepProfiler()
 
 
 class AbstractClass(ABC):
+    steps = (
+        "base_operation1",
+        "required_operations1",
+        "base_operation2",
+        "hook1",
+        "required_operations2",
+        "base_operation3",
+        "hook2",
+    )
+
+    # {"step": ["steps it needs to run after",]}, None keeps the steps in order
+    dependencies: Dict[str, Sequence[str]] = None
+
+    def step_dependencies(self) -> Dict[str, Tuple[str, ...]]:
+        if self.dependencies is None:
+            return {
+                step: tuple(self.steps[index - 1 : index])
+                for index, step in enumerate(self.steps)
+            }
+        return {step: tuple(self.dependencies.get(step, ())) for step in self.steps}
+
     def template_method(self) -> None:
-        self.base_operation1()
-        self.required_operations1()
-        self.base_operation2()
-        self.hook1()
-        self.required_operations2()
-        self.base_operation3()
-        self.hook2()
+        if profiler.enabled:
+            profiler.run(self, self.steps)
+            return
+
+        for step in self.steps:
+            getattr(self, step)()
 
     def base_operation1(self) -> None:
         print("AbstractClass: I am doing the bulk of the work")
@@ -66,6 +197,119 @@ class ConcreteClass2(AbstractClass):
         print("ConcreteClass2: Overridden Hook1")
 
 
+class IOBoundClass(AbstractClass):
+    dependencies = {
+        "required_operations1": ("base_operation1",),
+        "base_operation2": ("base_operation1",),
+        "hook1": ("base_operation1",),
+        "required_operations2": ("required_operations1", "base_operation2", "hook1"),
+        "base_operation3": ("required_operations2",),
+        "hook2": ("required_operations2",),
+    }
+
+    def required_operations1(self) -> None:
+        sleep(0.1)
+        print("IOBoundClass: Fetched Operation1 input")
+
+    def required_operations2(self) -> None:
+        print("IOBoundClass: Implemented Operation2")
+
+    def hook1(self) -> None:
+        sleep(0.1)
+        print("IOBoundClass: Fetched Hook1 input")
+
+
+class TemplateRunner:
+    """
+    Runs template steps on a thread pool as soon as the steps they depend
+    on are done. Steps of different instances share the pool, so a batch
+    of templates is pipelined.
+    """
+
+    def __init__(self, max_workers: int = 4) -> None:
+        self._executor = ThreadPoolExecutor(max_workers)
+
+    @staticmethod
+    def _check(graph: Dict[str, Tuple[str, ...]]) -> None:
+        remaining = {}
+        for step, after in graph.items():
+            unknown = [other for other in after if other not in graph]
+            if unknown:
+                raise ValueError(f"Template step {step!r} depends on unknown {unknown}")
+            remaining[step] = len(after)
+
+        ready = [step for step, count in remaining.items() if not count]
+        visited = 0
+        while ready:
+            step = ready.pop()
+            visited += 1
+            for other, after in graph.items():
+                if step in after:
+                    remaining[other] -= 1
+                    if not remaining[other]:
+                        ready.append(other)
+
+        if visited != len(graph):
+            raise ValueError("Template step dependencies contain a cycle")
+
+    def submit(self, instance: AbstractClass) -> Future:
+        graph = instance.step_dependencies()
+        self._check(graph)
+
+        done: Future = Future()
+        lock = threading.Lock()
+        remaining = {step: len(after) for step, after in graph.items()}
+        dependents: Dict[str, List[str]] = {step: [] for step in graph}
+        for step, after in graph.items():
+            for dependency in after:
+                dependents[dependency].append(step)
+        unfinished = [len(graph)]
+
+        def start(step: str) -> None:
+            if profiler.enabled:
+                future = self._executor.submit(profiler.run_step, instance, step)
+            else:
+                future = self._executor.submit(getattr(instance, step))
+            future.add_done_callback(lambda future: finish(step, future))
+
+        def finish(step: str, future: Future) -> None:
+            if future.exception() is not None:
+                with lock:
+                    if not done.done():
+                        done.set_exception(future.exception())
+                return
+
+            with lock:
+                unfinished[0] -= 1
+                ready = []
+                for dependent in dependents[step]:
+                    remaining[dependent] -= 1
+                    if not remaining[dependent]:
+                        ready.append(dependent)
+                if not unfinished[0] and not done.done():
+                    done.set_result(instance)
+
+            for dependent in ready:
+                start(dependent)
+
+        if not graph:
+            done.set_result(instance)
+        for step, count in list(remaining.items()):
+            if not count:
+                start(step)
+        return done
+
+    def run(self, instance: AbstractClass) -> None:
+        self.submit(instance).result()
+
+    def run_many(self, instances: Iterable[AbstractClass]) -> List[AbstractClass]:
+        futures = [self.submit(instance) for instance in instances]
+        return [future.result() for future in futures]
+
+    def close(self) -> None:
+        self._executor.shutdown()
+
+
 def client_code(abstract_class: AbstractClass) -> None:
 
     abstract_class.template_method()
@@ -78,3 +322,20 @@ if __name__ == "__main__":
 
     print("Same client code can work with different subclasses:")
     client_code(ConcreteClass2())
+    print("")
+
+    print("Same client code, profiled step by step:")
+    profiler.enable(track_allocations=True)
+    client_code(ConcreteClass1())
+    client_code(ConcreteClass2())
+    profiler.disable()
+    print("")
+    print(profiler.report())
+    print("")
+
+    print("Independent steps of a batch of templates run concurrently:")
+    runner = TemplateRunner(max_workers=8)
+    started = perf_counter()
+    runner.run_many([IOBoundClass() for _ in range(4)])
+    runner.close()
+    print(f"TemplateRunner: 4 templates took {perf_counter() - started:.2f}s")